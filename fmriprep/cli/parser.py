@@ -234,7 +234,16 @@ def _build_parser(**kwargs):
     g_perfm.add_argument(
         "--low-mem",
         action="store_true",
-        help="Attempt to reduce memory usage (will increase disk usage in working directory)",
+        help="Attempt to reduce memory usage (will increase disk usage in working directory). "
+        "Overrides --compress-work.",
+    )
+    g_perfm.add_argument(
+        "--compress-work",
+        action="store_true",
+        default=False,
+        help="Compress the resampled BOLD series kept in the working directory "
+        "(reduces disk usage, at the cost of CPU time). "
+        "By default, they are written uncompressed.",
     )
     g_perfm.add_argument(
         "--use-plugin",
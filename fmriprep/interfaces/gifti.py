@@ -6,6 +6,8 @@ import os
 import nibabel as nb
 import numpy as np
 from nipype.interfaces.base import File, SimpleInterface, TraitedSpec, isdefined, traits
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
 
 
 class CreateROIInputSpec(TraitedSpec):
@@ -61,3 +63,98 @@ class CreateROI(SimpleInterface):
         img.to_filename(out_filename)
         self._results["roi_file"] = out_filename
         return runtime
+
+
+class NearestMetricDilateInputSpec(TraitedSpec):
+    in_file = File(exists=True, mandatory=True, desc='metric GIFTI file to dilate')
+    surf_file = File(exists=True, mandatory=True, desc='surface GIFTI file to compute on')
+    distance = traits.Float(10.0, usedefault=True, desc='distance in mm to dilate')
+
+
+class NearestMetricDilateOutputSpec(TraitedSpec):
+    out_file = File(desc='dilated metric GIFTI file')
+
+
+class NearestMetricDilate(SimpleInterface):
+    """Fill zero-valued vertices with the value of the nearest non-zero vertex.
+
+    Emulates ``wb_command -metric-dilate -nearest`` on every column of the
+    metric. Distances are measured along the edges of the surface mesh, so
+    values never jump across a sulcus to a vertex that is close in space
+    but not on the same stretch of cortex.
+    Vertices with no good vertex within ``distance`` are left as zero.
+    """
+
+    input_spec = NearestMetricDilateInputSpec
+    output_spec = NearestMetricDilateOutputSpec
+
+    def _run_interface(self, runtime):
+        surf = nb.GiftiImage.from_filename(self.inputs.surf_file)
+        coords, triangles = surf.agg_data(('pointset', 'triangle'))
+
+        img = nb.GiftiImage.from_filename(self.inputs.in_file)
+        values = np.column_stack([darray.data for darray in img.darrays])
+        values = _nearest_dilate(values, coords, triangles, self.inputs.distance)
+        for darray, column in zip(img.darrays, values.T):
+            darray.data = np.ascontiguousarray(column, dtype=darray.data.dtype)
+
+        basename = os.path.basename(self.inputs.in_file).split('.')[0]
+        out_filename = os.path.join(runtime.cwd, f"{basename}_dilate.func.gii")
+        img.to_filename(out_filename)
+        self._results["out_file"] = out_filename
+        return runtime
+
+
+def _nearest_dilate(values, coords, triangles, distance):
+    """
+    Replace zeros in each column of ``values`` with the nearest non-zero vertex.
+
+    Distances are shortest paths along the edges of the mesh.
+    Columns sharing the same pattern of zeros (typically, all frames of a BOLD
+    series) are filled from a single shortest-path search.
+
+    Two parallel sheets, half a millimeter apart: vertex 3 is closest to vertex 0
+    in space, but takes its value from vertex 4, on its own sheet.
+
+    >>> coords = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]] * 2, dtype=float)
+    >>> coords[3:, 2] = 0.5
+    >>> triangles = np.array([[0, 1, 2], [3, 4, 5]])
+    >>> values = np.array([[1.0, 2.0], [0, 0], [0, 0], [0, 0], [5.0, 6.0], [0, 0]])
+    >>> _nearest_dilate(values, coords, triangles, 10.0)
+    array([[1., 2.],
+           [1., 2.],
+           [1., 2.],
+           [5., 6.],
+           [5., 6.],
+           [5., 6.]])
+    >>> _nearest_dilate(values, coords, triangles, 1.2)[:, 0]
+    array([1., 1., 1., 5., 5., 0.])
+
+    """
+    values = np.array(values, copy=True)
+    graph = _mesh_graph(coords, triangles)
+    patterns, inverse = np.unique(values.T == 0, axis=0, return_inverse=True)
+    for pattern_idx, bad in enumerate(patterns):
+        if not bad.any() or bad.all():
+            continue
+        columns = np.flatnonzero(inverse.reshape(-1) == pattern_idx)
+        dist, _, sources = dijkstra(
+            graph,
+            directed=False,
+            indices=np.flatnonzero(~bad),
+            limit=distance,
+            min_only=True,
+            return_predecessors=True,
+        )
+        found = bad & np.isfinite(dist)
+        values[np.ix_(found, columns)] = values[np.ix_(sources[found], columns)]
+    return values
+
+
+def _mesh_graph(coords, triangles):
+    """Build a sparse graph of the mesh edges, weighted by their lengths."""
+    edges = np.vstack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    # Every inner edge is shared by two triangles; keep one copy of each
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    lengths = np.linalg.norm(coords[edges[:, 0]] - coords[edges[:, 1]], axis=1)
+    return sparse.csr_matrix((lengths, (edges[:, 0], edges[:, 1])), shape=(len(coords),) * 2)
@@ -1,7 +1,14 @@
 import os
 
 import numpy as np
-from nipype.interfaces.base import File, SimpleInterface, TraitedSpec, traits
+from nipype.interfaces.base import (
+    File,
+    InputMultiObject,
+    SimpleInterface,
+    TraitedSpec,
+    isdefined,
+    traits,
+)
 from nipype.utils.filemanip import fname_presuffix
 
 
@@ -32,13 +39,17 @@ class Clip(SimpleInterface):
         import nibabel as nb
 
         img = nb.load(self.inputs.in_file)
-        data = img.get_fdata()
+        # Single-precision inputs are clipped in single precision
+        dtype = np.float32 if img.get_data_dtype() == np.float32 else np.float64
+        data = img.get_fdata(dtype=dtype)
 
         out_file = self.inputs.out_file
         if out_file:
             out_file = os.path.join(runtime.cwd, out_file)
 
-        if np.any((data < self.inputs.minimum) | (data > self.inputs.maximum)):
+        # Reductions avoid allocating two boolean volumes for the bounds check;
+        # NaN-aware ones, so that NaNs (e.g., failed T2* fits) do not hide out-of-range values
+        if np.nanmin(data) < self.inputs.minimum or np.nanmax(data) > self.inputs.maximum:
             if not out_file:
                 out_file = fname_presuffix(
                     self.inputs.in_file, suffix="_clipped", newpath=runtime.cwd
@@ -52,6 +63,53 @@ class Clip(SimpleInterface):
         return runtime
 
 
+class ClipAndMergeInputSpec(TraitedSpec):
+    in_files = InputMultiObject(File(exists=True), mandatory=True, desc="Input 3D volumes")
+    header_source = File(exists=True, desc="Image whose header provides the repetition time")
+    minimum = traits.Float(0.0, usedefault=True, desc="Values under minimum are set to minimum")
+    compress = traits.Bool(True, usedefault=True, desc="Write a compressed (.nii.gz) output")
+
+
+class ClipAndMergeOutputSpec(TraitedSpec):
+    out_file = File(desc="Merged 4D series")
+
+
+class ClipAndMerge(SimpleInterface):
+    """Clip a list of volumes to a minimum and merge them into a 4D series
+
+    Fuses a :class:`Clip` MapNode and a merge node: volumes are read straight into
+    a preallocated single-precision series, which is clipped in place and written once.
+    """
+
+    input_spec = ClipAndMergeInputSpec
+    output_spec = ClipAndMergeOutputSpec
+
+    def _run_interface(self, runtime):
+        import nibabel as nb
+
+        in_files = self.inputs.in_files
+        first = nb.load(in_files[0])
+        data = np.empty(first.shape[:3] + (len(in_files),), dtype=np.float32)
+        for idx, fname in enumerate(in_files):
+            data[..., idx] = np.asanyarray(nb.load(fname).dataobj, dtype=np.float32)
+        np.maximum(data, self.inputs.minimum, out=data)
+
+        out_img = nb.Nifti1Image(data, first.affine, first.header)
+        out_img.set_data_dtype(np.float32)
+        if isdefined(self.inputs.header_source):
+            src_hdr = nb.load(self.inputs.header_source).header
+            out_img.header.set_xyzt_units(t=src_hdr.get_xyzt_units()[-1])
+            out_img.header.set_zooms(out_img.header.get_zooms()[:3] + src_hdr.get_zooms()[3:4])
+
+        ext = ".nii.gz" if self.inputs.compress else ".nii"
+        out_file = fname_presuffix(
+            in_files[0], suffix="_merged" + ext, newpath=runtime.cwd, use_ext=False
+        )
+        out_img.to_filename(out_file)
+        self._results["out_file"] = out_file
+        return runtime
+
+
 class Label2MaskInputSpec(TraitedSpec):
     in_file = File(exists=True, mandatory=True, desc="Input label file")
     label_val = traits.Int(mandatory=True, dec="Label value to create mask from")
@@ -82,3 +140,244 @@ class Label2Mask(SimpleInterface):
 
         self._results["out_file"] = out_file
         return runtime
+
+
+class TemporalCoVInputSpec(TraitedSpec):
+    in_file = File(exists=True, mandatory=True, desc="Input 4D imaging file")
+
+
+class TemporalCoVOutputSpec(TraitedSpec):
+    mask_file = File(desc="Mask of voxels with a positive temporal mean")
+    cov_file = File(desc="Temporal coefficient of variation")
+
+
+class TemporalCoV(SimpleInterface):
+    """Calculate the temporal coefficient of variation (COV) of a 4D series
+
+    Reimplements the ``fslmaths -Tmean``, ``fslmaths -Tstd`` and ``fslmaths -div``
+    sequence in a single pass over the series.
+    The temporal mean is not written out, only its binarized mask (``fslmaths -bin``).
+    Volumes are accumulated one at a time with Welford's online algorithm, which avoids
+    allocating series-sized temporaries.
+    Voxels with zero mean are assigned a zero COV.
+    """
+
+    input_spec = TemporalCoVInputSpec
+    output_spec = TemporalCoVOutputSpec
+
+    def _run_interface(self, runtime):
+        import nibabel as nb
+
+        img = nb.load(self.inputs.in_file)
+        mean, std = _welford_mean_std(np.asanyarray(img.dataobj, dtype=np.float32))
+        cov = np.divide(std, mean, out=np.zeros_like(std), where=mean != 0)
+        # Only the sign of the mean is used downstream (fslmaths -bin)
+        mask = (mean > 0).astype(np.uint8)
+
+        for name, vol in (("mask", mask), ("cov", cov)):
+            out_img = img.__class__(vol, img.affine, img.header)
+            out_img.set_data_dtype(vol.dtype)
+            # Intermediate maps are written uncompressed, to save (de)compression time
+            out_file = fname_presuffix(
+                self.inputs.in_file, suffix=f"_{name}.nii", newpath=runtime.cwd, use_ext=False
+            )
+            out_img.to_filename(out_file)
+            self._results[f"{name}_file"] = out_file
+
+        return runtime
+
+
+class GoodVoxelsMaskInputSpec(TraitedSpec):
+    mask_file = File(
+        exists=True, mandatory=True, desc="Mask of voxels with a positive temporal mean"
+    )
+    cov_file = File(
+        exists=True, mandatory=True, desc="Temporal coefficient of variation of the BOLD series"
+    )
+    ribbon_file = File(
+        exists=True, mandatory=True, desc="Cortical ribbon mask, aligned with the BOLD series"
+    )
+    sigma = traits.Float(
+        5.0, usedefault=True, desc="Standard deviation (in mm) of the Gaussian smoothing kernel"
+    )
+
+
+class GoodVoxelsMaskOutputSpec(TraitedSpec):
+    out_mask = File(desc="Mask excluding voxels with locally high COV")
+    out_ribbon = File(desc="Cortical ribbon mask excluding voxels with locally high COV")
+
+
+class GoodVoxelsMask(SimpleInterface):
+    """Calculate an HCP-style "goodvoxels" mask from a temporal COV map
+
+    Reimplements the ``fslmaths``/``fslstats`` sequence of RibbonVolumeToSurfaceMapping.sh
+    from the DCAN-HCP pipelines on in-memory arrays.
+    The COV is normalized by its mean within the cortical ribbon, and modulated by
+    its local (smoothed) ribbon average.
+    Voxels whose modulated COV exceeds the ribbon mean by more than half a standard
+    deviation are excluded, as well as voxels with a non-positive temporal mean.
+    """
+
+    input_spec = GoodVoxelsMaskInputSpec
+    output_spec = GoodVoxelsMaskOutputSpec
+
+    def _run_interface(self, runtime):
+        import nibabel as nb
+        from scipy import ndimage as ndi
+
+        cov_img = nb.load(self.inputs.cov_file)
+        # Single precision halves the footprint of the (volume-sized) intermediates
+        cov = cov_img.get_fdata(dtype=np.float32)
+        positive_mean = np.asanyarray(nb.load(self.inputs.mask_file).dataobj) > 0
+        ribbon = np.asanyarray(nb.load(self.inputs.ribbon_file).dataobj) > 0
+
+        # fslmaths -s takes the kernel width in mm
+        sigma = self.inputs.sigma / np.array(cov_img.header.get_zooms()[:3])
+
+        ribbon_mean, _ = _nonzero_stats(cov[ribbon])
+        # Normalize in place; masking after normalizing gives the same cov_ribbon_norm
+        cov_norm = np.divide(cov, ribbon_mean, out=cov)
+        cov_ribbon_norm = cov_norm * ribbon
+
+        # fslmaths cov_ribbon_norm -bin -s 5
+        smooth_norm = ndi.gaussian_filter(
+            (cov_ribbon_norm > 0).astype(cov.dtype), sigma, mode="constant"
+        )
+        # fslmaths cov_ribbon_norm -s 5 -div smooth_norm -dilD
+        cov_ribbon_norm_smooth = ndi.gaussian_filter(
+            cov_ribbon_norm, sigma, output=cov_ribbon_norm, mode="constant"
+        )
+        _dilate_nonzero(
+            _safe_divide(cov_ribbon_norm_smooth, smooth_norm, out=cov_ribbon_norm_smooth)
+        )
+
+        cov_norm_modulate = _safe_divide(cov_norm, cov_ribbon_norm_smooth, out=cov_norm)
+        mod_mean, mod_std = _nonzero_stats(cov_norm_modulate[ribbon])
+        upper_thr = mod_mean + mod_std * 0.5
+
+        goodvoxels = _goodvoxels(cov_norm_modulate, upper_thr, positive_mean)
+        goodvoxels_ribbon = np.empty_like(goodvoxels)
+        np.logical_and(goodvoxels, ribbon, out=goodvoxels_ribbon.view(bool))
+
+        for key, suffix, mask in (
+            ("out_mask", "_goodvoxels", goodvoxels),
+            ("out_ribbon", "_goodvoxels_ribbon", goodvoxels_ribbon),
+        ):
+            out_img = cov_img.__class__(mask, cov_img.affine, cov_img.header)
+            out_img.set_data_dtype(np.uint8)
+            out_file = fname_presuffix(
+                self.inputs.cov_file,
+                suffix=f"{suffix}.nii.gz",
+                newpath=runtime.cwd,
+                use_ext=False,
+            )
+            out_img.to_filename(out_file)
+            self._results[key] = out_file
+
+        return runtime
+
+
+def _goodvoxels(cov_norm_modulate, upper_thr, positive_mean):
+    """Select voxels with a positive mean that are not outliers of the modulated COV.
+
+    Computes ``fslmaths cov_norm_modulate -thr upper_thr -bin -sub bin_mean -mul -1``,
+    where ``-thr`` zeroes values below ``upper_thr`` and ``-bin`` sets any non-zero
+    value to one, so a voxel is an outlier if its modulated COV is non-zero and not
+    below ``upper_thr``.
+    Voxels outside ``positive_mean`` are excluded, rather than set to -1.
+
+    >>> _goodvoxels(np.array([-1.0, 0.0, 0.5, 1.0, 2.0]), 1.0, np.ones(5, dtype=bool))
+    array([1, 1, 1, 0, 0], dtype=uint8)
+    >>> _goodvoxels(np.array([-1.0, -0.5, 0.0, 0.5]), -0.5, np.array([1, 1, 1, 0], dtype=bool))
+    array([1, 0, 1, 0], dtype=uint8)
+
+    """
+    # Comparisons are written straight into the uint8 output buffer
+    goodvoxels = np.empty(cov_norm_modulate.shape, dtype=np.uint8)
+    keep = goodvoxels.view(bool)
+    # -thr upper_thr -bin
+    np.greater_equal(cov_norm_modulate, upper_thr, out=keep)
+    keep &= cov_norm_modulate != 0
+    # -sub bin_mean -mul -1
+    np.logical_not(keep, out=keep)
+    keep &= positive_mean
+    return goodvoxels
+
+
+def _welford_mean_std(data):
+    """Calculate the mean and standard deviation along the last axis, one volume at a time."""
+    nvols = data.shape[-1]
+    mean = np.zeros(data.shape[:-1])
+    m2 = np.zeros_like(mean)
+    for i in range(nvols):
+        vol = data[..., i]
+        delta = vol - mean
+        mean += delta / (i + 1)
+        m2 += delta * (vol - mean)
+    # fslmaths -Tstd uses the unbiased estimator
+    return mean, np.sqrt(m2 / max(nvols - 1, 1))
+
+
+def _safe_divide(num, den, out=None):
+    """Divide two arrays, setting zero wherever the denominator is zero (as fslmaths does).
+
+    If ``out`` is given (it may be ``num`` itself), the quotient is written there.
+
+    >>> num = np.array([1.0, 2.0, 3.0])
+    >>> _safe_divide(num, np.array([2.0, 0.0, 1.0]), out=num)
+    array([0.5, 0. , 3. ])
+    >>> num
+    array([0.5, 0. , 3. ])
+
+    """
+    if out is None:
+        out = np.zeros_like(num)
+    else:
+        # Entries skipped by the division must be zeroed beforehand
+        out[den == 0] = 0
+    return np.divide(num, den, out=out, where=den != 0)
+
+
+def _nonzero_stats(values):
+    """Calculate the mean and standard deviation of non-zero values (as ``fslstats -M -S``).
+
+    Callers pass the voxels within a mask rather than a masked volume,
+    so only the masked values are copied and reduced.
+
+    >>> _nonzero_stats(np.array([0.0, 1.0, 0.0, 3.0]))
+    (2.0, 1.4142135623730951)
+
+    """
+    values = values[values != 0]
+    mean = values.mean()
+    # fslstats -S uses the unbiased estimator
+    std = np.sqrt(np.square(values - mean).sum() / (values.size - 1))
+    return float(mean), float(std)
+
+
+def _dilate_nonzero(data):
+    """Fill zero voxels with the value of their non-zero neighbors (as ``fslmaths -dilD``).
+
+    Modal dilation over a 3x3x3 box kernel; with continuous values every neighbor is
+    distinct, so ties are resolved towards the smallest value.
+    The input array is modified in place.
+
+    >>> data = np.zeros((5, 5, 5))
+    >>> data[2, 2, 2], data[2, 2, 3] = 2.0, 1.0
+    >>> out = _dilate_nonzero(data)
+    >>> out is data
+    True
+    >>> out[2, 2, 1:]
+    array([2., 2., 1., 1.])
+    >>> int(np.count_nonzero(out)), float(out[0, 0, 0])
+    (36, 0.0)
+
+    """
+    from scipy import ndimage as ndi
+
+    zeros = data == 0
+    neighbors = ndi.minimum_filter(
+        np.where(zeros, np.inf, data), size=3, mode="constant", cval=np.inf
+    )
+    np.copyto(data, neighbors, where=zeros & np.isfinite(neighbors))
+    return data
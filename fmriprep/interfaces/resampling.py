@@ -0,0 +1,302 @@
+"""Interfaces for resampling images in a single shot."""
+from concurrent.futures import ThreadPoolExecutor
+
+import nibabel as nb
+import nitransforms as nt
+import numpy as np
+from nipype.interfaces.base import (
+    File,
+    InputMultiObject,
+    SimpleInterface,
+    TraitedSpec,
+    isdefined,
+    traits,
+)
+from nipype.utils.filemanip import fname_presuffix
+from scipy import ndimage as ndi
+
+from fmriprep.utils.transforms import load_transforms
+
+#: Number of target voxels each thread maps and interpolates at once
+CHUNK_SIZE = 2**18
+
+
+class ResampleSeriesInputSpec(TraitedSpec):
+    in_file = InputMultiObject(
+        File(exists=True),
+        mandatory=True,
+        desc="Series to resample, either a 4D image or a list of 3D volumes",
+    )
+    ref_file = File(exists=True, mandatory=True, desc="Reference image defining the target grid")
+    transforms = InputMultiObject(
+        traits.Either(File(exists=True), traits.Enum("identity")),
+        mandatory=True,
+        desc="Transforms in ANTs order (reference first); "
+        "per-volume head-motion transforms, if any, must come last",
+    )
+    header_source = File(exists=True, desc="Image whose header provides the repetition time")
+    order = traits.Int(3, usedefault=True, desc="Order of the spline interpolation")
+    clip = traits.Bool(
+        True, usedefault=True, desc="Clip negative values produced by the interpolation"
+    )
+    compress = traits.Bool(True, usedefault=True, desc="Write a compressed (.nii.gz) output")
+    num_threads = traits.Int(1, usedefault=True, desc="Number of volumes resampled concurrently")
+
+
+class ResampleSeriesOutputSpec(TraitedSpec):
+    out_file = File(desc="Resampled series")
+
+
+class ResampleSeries(SimpleInterface):
+    """Resample a BOLD series into a target grid in a single shot.
+
+    The transforms shared by all volumes are composed and applied once to the
+    coordinates of the target grid; only the per-volume head-motion affine
+    is applied separately for every volume before interpolation.
+    """
+
+    input_spec = ResampleSeriesInputSpec
+    output_spec = ResampleSeriesOutputSpec
+
+    def _run_interface(self, runtime):
+        in_files = self.inputs.in_file
+        source = nb.load(in_files[0])
+        if len(in_files) > 1:
+            # Fill a preallocated series, rather than stacking copies of the volumes
+            data = np.empty(source.shape[:3] + (len(in_files),), dtype=np.float32)
+            for idx, fname in enumerate(in_files):
+                data[..., idx] = np.asanyarray(nb.load(fname).dataobj, dtype=np.float32)
+        else:
+            data = np.asanyarray(source.dataobj, dtype=np.float32)
+        if data.ndim == 3:
+            data = data[..., np.newaxis]
+
+        target = nb.load(self.inputs.ref_file)
+        resampled = resample_series(
+            data,
+            source.affine,
+            target,
+            load_transforms(self.inputs.transforms),
+            order=self.inputs.order,
+            num_threads=self.inputs.num_threads,
+        )
+        if self.inputs.clip:
+            # Interpolation can occasionally produce below-zero values as an artifact
+            np.clip(resampled, 0, None, out=resampled)
+
+        out_img = nb.Nifti1Image(resampled, target.affine, target.header)
+        out_img.set_data_dtype(np.float32)
+        hdr_source = (
+            self.inputs.header_source if isdefined(self.inputs.header_source) else in_files[0]
+        )
+        src_hdr = nb.load(hdr_source).header
+        if len(src_hdr.get_zooms()) > 3:
+            out_img.header.set_xyzt_units(t=src_hdr.get_xyzt_units()[-1])
+            out_img.header.set_zooms(out_img.header.get_zooms()[:3] + src_hdr.get_zooms()[3:4])
+
+        ext = ".nii.gz" if self.inputs.compress else ".nii"
+        self._results["out_file"] = fname_presuffix(
+            in_files[0], suffix="_resampled" + ext, newpath=runtime.cwd, use_ext=False
+        )
+        out_img.to_filename(self._results["out_file"])
+        return runtime
+
+
+class ResampleImagesInputSpec(TraitedSpec):
+    in_files = InputMultiObject(File(exists=True), mandatory=True, desc="3D images to resample")
+    orders = InputMultiObject(
+        traits.Either(traits.Int, traits.Enum("label")),
+        mandatory=True,
+        desc="Spline interpolation order for each image, or ``label`` for label maps",
+    )
+    ref_file = File(exists=True, mandatory=True, desc="Reference image defining the target grid")
+    transforms = InputMultiObject(
+        traits.Either(File(exists=True), traits.Enum("identity")),
+        mandatory=True,
+        desc="Transforms shared by all images, in ANTs order (reference first)",
+    )
+
+
+class ResampleImagesOutputSpec(TraitedSpec):
+    out_files = traits.List(File(exists=True), desc="Resampled images, one per input")
+
+
+class ResampleImages(SimpleInterface):
+    """Resample several 3D images into a target grid, through the same transforms.
+
+    The target grid is mapped through the transforms once, and the mapped
+    coordinates are reused to interpolate every input image.
+    Label maps (``"label"``) are resampled by voting among the eight source
+    voxels surrounding each target voxel, weighted by their trilinear weights.
+    Label maps and nearest-neighbour (order 0) images keep their data type;
+    other images are written in single precision, and NaNs in them are
+    carried over by nearest neighbour rather than spread by the interpolation.
+    """
+
+    input_spec = ResampleImagesInputSpec
+    output_spec = ResampleImagesOutputSpec
+
+    def _run_interface(self, runtime):
+        if len(self.inputs.orders) != len(self.inputs.in_files):
+            raise ValueError("One interpolation order must be given per input image")
+
+        target = nb.load(self.inputs.ref_file)
+        coordinates = _target_coordinates(target, load_transforms(self.inputs.transforms))
+
+        self._results["out_files"] = []
+        for in_file, order in zip(self.inputs.in_files, self.inputs.orders):
+            img = nb.load(in_file)
+            ras2vox = np.linalg.inv(img.affine)
+            ijk = ras2vox[:3, :3] @ coordinates + ras2vox[:3, 3:]
+            if order == "label":
+                dtype = img.get_data_dtype()
+                resampled = _label_vote(np.asanyarray(img.dataobj, dtype=dtype), ijk)
+            else:
+                dtype = img.get_data_dtype() if order == 0 else np.float32
+                resampled = _interpolate(np.asanyarray(img.dataobj, dtype=dtype), ijk, order)
+            resampled = resampled.reshape(target.shape[:3])
+
+            out_img = nb.Nifti1Image(resampled, target.affine, target.header)
+            out_img.set_data_dtype(dtype)
+            out_file = fname_presuffix(
+                in_file, suffix="_trans.nii.gz", newpath=runtime.cwd, use_ext=False
+            )
+            out_img.to_filename(out_file)
+            self._results["out_files"].append(out_file)
+        return runtime
+
+
+def resample_series(data, affine, target, transforms, order=3, num_threads=1):
+    """Resample the volumes of a series onto the grid of ``target``.
+
+    Parameters
+    ----------
+    data : :obj:`numpy.ndarray`
+        4D array, the last axis indexing volumes.
+    affine : :obj:`numpy.ndarray`
+        Voxel-to-RAS affine of ``data``.
+    target : :obj:`nibabel.spatialimages.SpatialImage`
+        Image defining the output grid.
+    transforms : :obj:`list`
+        nitransforms objects in ANTs order, as returned by
+        :func:`~fmriprep.utils.transforms.load_transforms`.
+        If the last one is a :class:`~nitransforms.linear.LinearTransformsMapping`,
+        it is taken as one head-motion transform per volume.
+    order : :obj:`int`
+        Order of the spline interpolation.
+    num_threads : :obj:`int`
+        Number of volumes resampled concurrently.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray`
+        The resampled series, with shape ``target.shape[:3] + (nvols,)``.
+
+    """
+    transforms = list(transforms)
+    nvols = data.shape[-1]
+
+    hmc = None
+    if transforms and isinstance(transforms[-1], nt.linear.LinearTransformsMapping):
+        hmc = transforms.pop().matrix
+        if len(hmc) != nvols:
+            raise ValueError(
+                f"Got {len(hmc)} head-motion transforms for a series of {nvols} volumes"
+            )
+    if any(isinstance(xfm, nt.linear.LinearTransformsMapping) for xfm in transforms):
+        raise ValueError("Per-volume (head-motion) transforms must be listed last")
+
+    shape = target.shape[:3]
+    # Map the target grid through the shared transforms only once
+    coordinates = _target_coordinates(target, transforms)
+
+    ras2vox = np.linalg.inv(affine)
+    nvox = coordinates.shape[1]
+    # Volumes go first, so each one is contiguous and can be written in place
+    resampled = np.zeros((nvols,) + shape, dtype=np.float32)
+
+    def _resample_volume(idx):
+        ras2vox_vol = ras2vox if hmc is None else ras2vox @ hmc[idx]
+        volume = data[..., idx]
+        if order > 1:
+            # Prefilter once per volume instead of once per chunk
+            volume = ndi.spline_filter(volume, order=order, output=np.float64, mode="constant")
+        out = resampled[idx].reshape(-1)
+        for start in range(0, nvox, CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            ndi.map_coordinates(
+                volume,
+                ras2vox_vol[:3, :3] @ coordinates[:, chunk] + ras2vox_vol[:3, 3:],
+                output=out[chunk],
+                order=order,
+                mode="constant",
+                cval=0.0,
+                prefilter=False,
+            )
+
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        # Consume the iterator, so exceptions are raised
+        list(pool.map(_resample_volume, range(nvols)))
+
+    return np.moveaxis(resampled, 0, -1)
+
+
+def _target_coordinates(target, transforms):
+    """Map the RAS+ coordinates of the ``target`` grid through ``transforms``.
+
+    Returns a single-precision 3 x N array.
+    """
+    coordinates = nt.base.ImageGrid(target).ndcoords.T
+    if transforms:
+        coordinates = nt.TransformChain(transforms).map(coordinates)
+    return np.asanyarray(coordinates, dtype=np.float32).T
+
+
+def _interpolate(data, ijk, order):
+    """Interpolate ``data`` at voxel coordinates ``ijk``, keeping NaNs from spreading.
+
+    The spline prefilter would smear a single NaN over most of the volume,
+    so NaNs are zeroed before interpolating and restored at the target
+    points whose nearest source voxel is NaN.
+    """
+    nans = np.isnan(data) if order > 0 else None
+    if nans is None or not nans.any():
+        return ndi.map_coordinates(data, ijk, order=order, mode="constant", cval=0)
+
+    resampled = ndi.map_coordinates(
+        np.where(nans, 0, data), ijk, order=order, mode="constant", cval=0
+    )
+    nearest_nan = ndi.map_coordinates(nans.view(np.uint8), ijk, order=0, mode="constant", cval=0)
+    resampled[nearest_nan > 0] = np.nan
+    return resampled
+
+
+def _label_vote(labels, ijk):
+    """Pick, at each point of ``ijk``, the label with the largest summed trilinear weight.
+
+    Only the eight voxels surrounding each point take part in the vote;
+    those falling outside the volume count as background (0).
+
+    >>> labels = np.zeros((2, 2, 2), dtype=np.int16)
+    >>> labels[1] = 3
+    >>> labels[1, 1, 1] = 7
+    >>> _label_vote(labels, np.array([[0.2, 0.6, 0.9], [0.5, 0.5, 0.9], [0.5, 0.5, 0.9]]))
+    array([0, 3, 7], dtype=int16)
+
+    """
+    base = np.floor(ijk).astype(int)
+    frac = (ijk - base).astype(np.float32)
+    shape = np.array(labels.shape)[:, np.newaxis]
+
+    corners = np.zeros((8, ijk.shape[1]), dtype=labels.dtype)
+    weights = np.empty((8, ijk.shape[1]), dtype=np.float32)
+    for idx, offset in enumerate(np.ndindex(2, 2, 2)):
+        offset = np.array(offset)[:, np.newaxis]
+        voxel = base + offset
+        inside = np.all((voxel >= 0) & (voxel < shape), axis=0)
+        corners[idx, inside] = labels[tuple(voxel[:, inside])]
+        weights[idx] = np.prod(np.where(offset, frac, 1 - frac), axis=0)
+
+    # Total weight of the label of every corner, so the winning corner carries the vote
+    votes = np.stack([(weights * (corners == corner)).sum(0) for corner in corners])
+    return np.take_along_axis(corners, votes.argmax(0)[np.newaxis], axis=0)[0]
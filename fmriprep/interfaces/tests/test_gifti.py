@@ -0,0 +1,56 @@
+import nibabel as nb
+import numpy as np
+from nipype.pipeline import engine as pe
+
+from fmriprep.interfaces.gifti import NearestMetricDilate
+
+
+def test_NearestMetricDilate(tmp_path):
+    # A strip of triangles along x, folded back over itself half a millimeter above
+    xs = np.arange(6, dtype=np.float32)
+    lower = np.column_stack([np.repeat(xs, 2), np.tile([0, 1], 6), np.zeros(12)])
+    upper = lower[::-1] + [0, 0, 0.5]
+    coords = np.vstack([lower, upper]).astype(np.float32)
+    # Vertices are numbered continuously across the fold, which joins the far ends
+    triangles = np.array([[i, i + 1, i + 2] for i in range(22)], dtype=np.int32)
+    surf_file = str(tmp_path / "sub-01_hemi-L_midthickness.surf.gii")
+    nb.GiftiImage(
+        darrays=[
+            nb.gifti.GiftiDataArray(coords, intent='NIFTI_INTENT_POINTSET'),
+            nb.gifti.GiftiDataArray(triangles, intent='NIFTI_INTENT_TRIANGLE'),
+        ]
+    ).to_filename(surf_file)
+
+    values = np.zeros((24, 2), dtype=np.float32)
+    values[0] = [1, 2]
+    values[22] = [5, 6]
+    in_file = str(tmp_path / "sub-01_hemi-L_bold.func.gii")
+    in_img = nb.GiftiImage(
+        darrays=[
+            nb.gifti.GiftiDataArray(column, meta=nb.gifti.GiftiMetaData(Name=f"frame{idx}"))
+            for idx, column in enumerate(values.T)
+        ],
+        meta=nb.gifti.GiftiMetaData(AnatomicalStructurePrimary="CortexLeft"),
+    )
+    in_img.to_filename(in_file)
+
+    dilate = pe.Node(
+        NearestMetricDilate(in_file=in_file, surf_file=surf_file, distance=2.5),
+        name="dilate",
+        base_dir=tmp_path,
+    )
+    ret = dilate.run()
+
+    assert ret.outputs.out_file == str(tmp_path / "dilate" / "sub-01_hemi-L_bold_dilate.func.gii")
+    out_img = nb.load(ret.outputs.out_file)
+    assert out_img.meta["AnatomicalStructurePrimary"] == "CortexLeft"
+    assert [darray.meta["Name"] for darray in out_img.darrays] == ["frame0", "frame1"]
+    assert all(darray.data.dtype == np.float32 for darray in out_img.darrays)
+
+    out_values = np.column_stack(out_img.agg_data())
+    # Vertices of the lower sheet take their values from vertex 0, along the surface,
+    # even when vertex 22 (upper sheet) sits right above them
+    assert np.array_equal(out_values[1:4], [[1, 2]] * 3)
+    assert np.array_equal(out_values[20:24], [[5, 6]] * 4)
+    # Vertices more than 2.5 mm away from any good vertex along the surface are left out
+    assert not out_values[5:18].any()
@@ -1,8 +1,15 @@
 import nibabel as nb
 import numpy as np
+import pytest
 from nipype.pipeline import engine as pe
 
-from fmriprep.interfaces.maths import Clip
+from fmriprep.interfaces.maths import (
+    Clip,
+    ClipAndMerge,
+    GoodVoxelsMask,
+    TemporalCoV,
+    _goodvoxels,
+)
 
 
 def test_Clip(tmp_path):
@@ -41,3 +48,121 @@ def test_Clip(tmp_path):
     assert ret.outputs.out_file == str(tmp_path / "nonpositive/input_clipped.nii")
     out_img = nb.load(ret.outputs.out_file)
     assert np.allclose(out_img.get_fdata(), [[[-1.0, 0.0], [-2.0, 0.0]]])
+
+    in_file_f32 = str(tmp_path / "input_f32.nii")
+    nb.Nifti1Image(data.astype(np.float32), np.eye(4)).to_filename(in_file_f32)
+    clip_f32 = pe.Node(Clip(in_file=in_file_f32, minimum=0), name="clip_f32", base_dir=tmp_path)
+
+    ret = clip_f32.run()
+
+    out_img = nb.load(ret.outputs.out_file)
+    assert out_img.get_data_dtype() == np.float32
+    assert np.allclose(out_img.get_fdata(), [[[0.0, 1.0], [0.0, 2.0]]])
+
+    in_file_nan = str(tmp_path / "input_nan.nii")
+    nb.Nifti1Image(np.array([[[np.nan, -1.0, 2.0]]]), np.eye(4)).to_filename(in_file_nan)
+    clip_nan = pe.Node(Clip(in_file=in_file_nan, minimum=0), name="clip_nan", base_dir=tmp_path)
+
+    ret = clip_nan.run()
+
+    assert ret.outputs.out_file == str(tmp_path / "clip_nan/input_nan_clipped.nii")
+    out_data = nb.load(ret.outputs.out_file).get_fdata()
+    assert np.isnan(out_data[0, 0, 0])
+    assert np.allclose(out_data[0, 0, 1:], [0.0, 2.0])
+
+
+def test_TemporalCoV(tmp_path):
+    in_file = str(tmp_path / "bold.nii")
+    rng = np.random.default_rng(1234)
+    data = rng.normal(100, 5, size=(4, 4, 4, 20)).astype(np.float32)
+    data[0, 0, 0] = 0
+    nb.Nifti1Image(data, np.eye(4)).to_filename(in_file)
+
+    tcov = pe.Node(TemporalCoV(in_file=in_file), name="tcov", base_dir=tmp_path)
+    ret = tcov.run()
+
+    assert ret.outputs.mask_file == str(tmp_path / "tcov" / "bold_mask.nii")
+    assert ret.outputs.cov_file == str(tmp_path / "tcov" / "bold_cov.nii")
+    mask = np.asanyarray(nb.load(ret.outputs.mask_file).dataobj)
+    cov = nb.load(ret.outputs.cov_file).get_fdata()
+    assert mask.shape == cov.shape == (4, 4, 4)
+    assert mask.dtype == np.uint8
+    assert np.array_equal(mask, data.mean(-1) > 0)
+    assert np.allclose(cov[1:], data[1:].std(-1, ddof=1) / data[1:].mean(-1), rtol=1e-4)
+    assert cov[0, 0, 0] == 0
+
+
+def test_GoodVoxelsMask(tmp_path):
+    shape = (12, 12, 12)
+    rng = np.random.default_rng(1234)
+    cov = rng.uniform(0.01, 0.02, size=shape).astype(np.float32)
+    cov[6, 6, 6] = 1.0  # Outlier
+    mean_mask = np.ones(shape, dtype=np.uint8)
+    mean_mask[0] = 0  # Out of the brain
+    ribbon = np.zeros(shape, dtype=np.uint8)
+    ribbon[2:10, 2:10, 2:10] = 1
+
+    files = {}
+    for name, data in (("mask", mean_mask), ("cov", cov), ("ribbon", ribbon)):
+        files[name] = str(tmp_path / f"{name}.nii")
+        nb.Nifti1Image(data, np.diag([2.0, 2.0, 2.0, 1.0])).to_filename(files[name])
+
+    goodvoxels = pe.Node(
+        GoodVoxelsMask(
+            mask_file=files["mask"], cov_file=files["cov"], ribbon_file=files["ribbon"]
+        ),
+        name="goodvoxels",
+        base_dir=tmp_path,
+    )
+    ret = goodvoxels.run()
+
+    assert ret.outputs.out_mask.endswith("cov_goodvoxels.nii.gz")
+    mask = np.asanyarray(nb.load(ret.outputs.out_mask).dataobj)
+    assert mask.dtype == np.uint8
+    assert mask[6, 6, 6] == 0
+    assert not mask[0].any()
+    assert mask[1:].sum() > 0.9 * mask[1:].size
+
+    ribbon_mask = np.asanyarray(nb.load(ret.outputs.out_ribbon).dataobj)
+    assert np.array_equal(ribbon_mask, mask & ribbon)
+
+
+@pytest.mark.parametrize("upper_thr", [1.0, 0.0, -0.5])
+def test_goodvoxels_threshold(upper_thr):
+    rng = np.random.default_rng(1234)
+    cov_norm_modulate = rng.normal(0.5, 1.0, size=(8, 8, 8))
+    cov_norm_modulate[0] = 0
+    cov_norm_modulate[1, 0] = upper_thr
+    bin_mean = (rng.uniform(size=cov_norm_modulate.shape) > 0.1).astype(float)
+
+    # fslmaths cov_norm_modulate -thr upper_thr -bin -sub bin_mean -mul -1
+    thr = np.where(cov_norm_modulate < upper_thr, 0, cov_norm_modulate)
+    expected = ((thr != 0).astype(float) - bin_mean) * -1
+
+    goodvoxels = _goodvoxels(cov_norm_modulate, upper_thr, bin_mean > 0)
+    assert goodvoxels.dtype == np.uint8
+    # Outliers outside the positive-mean mask come out of fslmaths as -1
+    assert np.array_equal(goodvoxels, expected > 0)
+
+
+def test_ClipAndMerge(tmp_path):
+    source = str(tmp_path / "source.nii")
+    source_img = nb.Nifti1Image(np.zeros((2, 2, 1, 2), dtype=np.float32), np.eye(4))
+    source_img.header.set_zooms((1, 1, 1, 2.0))
+    source_img.to_filename(source)
+    in_files = [str(tmp_path / f"vol{idx}.nii") for idx in range(2)]
+    data = np.array([[[-1.0], [1.0]], [[-2.0], [2.0]]])
+    for idx, fname in enumerate(in_files):
+        nb.Nifti1Image(data * (idx + 1), np.eye(4)).to_filename(fname)
+
+    merge = pe.Node(
+        ClipAndMerge(in_files=in_files, header_source=source), name="merge", base_dir=tmp_path
+    )
+    ret = merge.run()
+
+    assert ret.outputs.out_file == str(tmp_path / "merge/vol0_merged.nii.gz")
+    out_img = nb.load(ret.outputs.out_file)
+    assert out_img.get_data_dtype() == np.float32
+    assert out_img.header.get_zooms() == (1, 1, 1, 2.0)
+    assert np.allclose(out_img.get_fdata()[..., 0], [[[0.0], [1.0]], [[0.0], [2.0]]])
+    assert np.allclose(out_img.get_fdata()[..., 1], [[[0.0], [2.0]], [[0.0], [4.0]]])
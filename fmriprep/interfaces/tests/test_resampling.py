@@ -0,0 +1,277 @@
+import h5py
+import nibabel as nb
+import nitransforms as nt
+import numpy as np
+from nipype.pipeline import engine as pe
+
+from fmriprep.interfaces import resampling
+from fmriprep.interfaces.resampling import (
+    ResampleImages,
+    ResampleSeries,
+    resample_series,
+)
+from fmriprep.utils.transforms import load_ants_h5
+
+ITK_TEMPLATE = """\
+#Insight Transform File V1.0
+{}"""
+
+ITK_AFFINE = """\
+#Transform {idx}
+Transform: MatrixOffsetTransformBase_double_3_3
+Parameters: 1 0 0 0 1 0 0 0 1 {x} {y} {z}
+FixedParameters: 0 0 0
+"""
+
+
+def _write_itk(fname, translations):
+    """Write ITK translations, given in LPS+ coordinates."""
+    fname.write_text(
+        ITK_TEMPLATE.format(
+            "".join(
+                ITK_AFFINE.format(idx=idx, x=x, y=y, z=z)
+                for idx, (x, y, z) in enumerate(translations)
+            )
+        )
+    )
+    return str(fname)
+
+
+def test_ResampleSeries(tmp_path, monkeypatch):
+    rng = np.random.default_rng(1234)
+    data = rng.normal(100, 10, size=(8, 9, 10, 2)).astype(np.float32)
+    data[0, 0, 0, 0] = -5
+    bold = nb.Nifti1Image(data, np.eye(4))
+    bold.header.set_zooms((1, 1, 1, 2.5))
+    bold_file = str(tmp_path / "bold.nii.gz")
+    bold.to_filename(bold_file)
+    ref_file = str(tmp_path / "ref.nii.gz")
+    nb.Nifti1Image(data[..., 0], np.eye(4)).to_filename(ref_file)
+
+    identity = pe.Node(
+        ResampleSeries(in_file=bold_file, ref_file=ref_file, transforms=["identity"], order=1),
+        name="identity",
+        base_dir=tmp_path,
+    )
+    ret = identity.run()
+
+    out_img = nb.load(ret.outputs.out_file)
+    assert ret.outputs.out_file.endswith("bold_resampled.nii.gz")
+    assert out_img.header.get_zooms() == (1, 1, 1, 2.5)
+    assert np.allclose(out_img.get_fdata()[1:], data[1:])
+    assert np.allclose(out_img.get_fdata()[0, 0, 0], [0, data[0, 0, 0, 1]])
+
+    # Interpolating in chunks does not change the result
+    subvoxel = np.eye(4)
+    subvoxel[:3, 3] = [0.3, -0.2, 0.1]
+    whole = resample_series(data, np.eye(4), nb.load(ref_file), [nt.Affine(subvoxel)])
+    monkeypatch.setattr(resampling, "CHUNK_SIZE", 100)
+    chunked = resample_series(data, np.eye(4), nb.load(ref_file), [nt.Affine(subvoxel)])
+    assert np.array_equal(whole, chunked)
+
+    # Identity transforms on the same grid are interpolated like any other
+    identity = resample_series(data, np.eye(4), nb.load(ref_file), [nt.Affine()], order=3)
+    assert identity.dtype == np.float32
+    assert np.allclose(identity, data, atol=1e-3)
+
+    # One-voxel shift along x for all volumes, plus a shift along y for the second one
+    # (ITK translations are LPS+, so the signs are flipped for x and y)
+    shared = _write_itk(tmp_path / "shared.txt", [(-1, 0, 0)])
+    hmc = _write_itk(tmp_path / "hmc.txt", [(0, 0, 0), (0, -1, 0)])
+    split = []
+    for idx, vol in enumerate(nb.four_to_three(bold)):
+        split.append(str(tmp_path / f"vol{idx}.nii.gz"))
+        vol.to_filename(split[-1])
+
+    shifted = pe.Node(
+        ResampleSeries(
+            in_file=split,
+            ref_file=ref_file,
+            transforms=[shared, "identity", hmc],
+            header_source=bold_file,
+            order=1,
+            compress=False,
+        ),
+        name="shifted",
+        base_dir=tmp_path,
+    )
+    ret = shifted.run()
+
+    out_img = nb.load(ret.outputs.out_file)
+    assert ret.outputs.out_file.endswith("vol0_resampled.nii")
+    assert out_img.header.get_zooms() == (1, 1, 1, 2.5)
+    out_data = out_img.get_fdata()
+    assert np.allclose(out_data[:-1, :, :, 0], data[1:, :, :, 0])
+    assert np.allclose(out_data[:-1, :-1, :, 1], data[1:, 1:, :, 1])
+    assert not out_data[-1].any()
+
+
+def test_ResampleImages(tmp_path):
+    rng = np.random.default_rng(1234)
+    labels = rng.integers(0, 50, size=(8, 9, 10)).astype(np.int16)
+    t2star = rng.normal(30, 5, size=(8, 9, 10))
+    label_file = str(tmp_path / "aseg.nii.gz")
+    t2star_file = str(tmp_path / "t2star.nii.gz")
+    nb.Nifti1Image(labels, np.eye(4)).to_filename(label_file)
+    nb.Nifti1Image(t2star, np.eye(4)).to_filename(t2star_file)
+
+    # One-voxel shift along x (ITK translations are LPS+)
+    shift = _write_itk(tmp_path / "shift.txt", [(-1, 0, 0)])
+    node = pe.Node(
+        ResampleImages(
+            in_files=[label_file, t2star_file],
+            orders=[0, 1],
+            ref_file=label_file,
+            transforms=[shift],
+        ),
+        name="resample_images",
+        base_dir=tmp_path,
+    )
+    ret = node.run()
+
+    out_labels, out_t2star = (nb.load(fname) for fname in ret.outputs.out_files)
+    assert out_labels.get_data_dtype() == np.int16
+    assert np.array_equal(np.asanyarray(out_labels.dataobj)[:-1], labels[1:])
+    assert out_t2star.get_data_dtype() == np.float32
+    assert np.allclose(out_t2star.get_fdata()[:-1], t2star[1:], atol=1e-4)
+    assert not out_t2star.get_fdata()[-1].any()
+
+    # A single input still produces a list of outputs
+    single = pe.Node(
+        ResampleImages(
+            in_files=[t2star_file], orders=[1], ref_file=label_file, transforms=[shift]
+        ),
+        name="single",
+        base_dir=tmp_path,
+    )
+    assert len(single.run().outputs.out_files) == 1
+
+
+def test_ResampleImages_nan_label(tmp_path):
+    rng = np.random.default_rng(1234)
+    t2star = rng.normal(30, 5, size=(20, 20, 20))
+    t2star[10, 10, 10] = np.nan
+    labels = np.zeros((20, 20, 20), dtype=np.int16)
+    labels[5:15, 5:15, 5:15] = 17
+    t2star_file = str(tmp_path / "t2star.nii.gz")
+    label_file = str(tmp_path / "aseg.nii.gz")
+    nb.Nifti1Image(t2star, np.eye(4)).to_filename(t2star_file)
+    nb.Nifti1Image(labels, np.eye(4)).to_filename(label_file)
+
+    # A 0.4 mm shift along x (ITK translations are LPS+)
+    shift = _write_itk(tmp_path / "shift.txt", [(-0.4, 0, 0)])
+    node = pe.Node(
+        ResampleImages(
+            in_files=[t2star_file, label_file],
+            orders=[3, "label"],
+            ref_file=label_file,
+            transforms=[shift],
+        ),
+        name="nan_label",
+        base_dir=tmp_path,
+    )
+    ret = node.run()
+
+    out_t2star, out_labels = (nb.load(fname) for fname in ret.outputs.out_files)
+    # The NaN stays where its nearest neighbour is, and does not spread
+    nans = np.isnan(out_t2star.get_fdata())
+    assert nans.sum() == 1
+    assert nans[10, 10, 10]
+    assert np.isfinite(out_t2star.get_fdata()[2:8]).all()
+
+    # Each target voxel takes the label covering most of it
+    assert out_labels.get_data_dtype() == np.int16
+    assert np.array_equal(np.asanyarray(out_labels.dataobj)[:-1], labels[:-1])
+
+
+def test_ResampleImages_chain_order(tmp_path):
+    labels = np.arange(1, 1001, dtype=np.int16).reshape((10, 10, 10))
+    label_file = str(tmp_path / "labels.nii.gz")
+    nb.Nifti1Image(labels, np.eye(4)).to_filename(label_file)
+
+    # A rotation about z and a translation along x do not commute
+    rotation = np.eye(4)
+    rotation[:2, :2] = [[0, -1], [1, 0]]
+    translation = np.eye(4)
+    translation[0, 3] = 9
+    xfms = []
+    for name, matrix in (("rotation", rotation), ("translation", translation)):
+        xfms.append(str(tmp_path / f"{name}.txt"))
+        nt.Affine(matrix).to_filename(xfms[-1], fmt="itk")
+
+    node = pe.Node(
+        ResampleImages(in_files=[label_file], orders=[0], ref_file=label_file, transforms=xfms),
+        name="chain_order",
+        base_dir=tmp_path,
+    )
+    ret = node.run()
+
+    # Reference points go through the first transform first: (i, j, k) -> (9 - j, i, k)
+    out_data = np.asanyarray(nb.load(ret.outputs.out_files[0]).dataobj)
+    i, j, k = np.indices(labels.shape)
+    assert np.array_equal(out_data, labels[9 - j, i, k])
+
+
+def test_ResampleImages_field_fov(tmp_path):
+    data = np.arange(1, 1001, dtype=np.float32).reshape((10, 10, 10))
+    data[0, 0, 0] = 999
+    in_file = str(tmp_path / "in.nii.gz")
+    nb.Nifti1Image(data, np.eye(4)).to_filename(in_file)
+
+    # The target grid extends 5 mm beyond the input (and field) on every side
+    ref_affine = np.eye(4)
+    ref_affine[:3, 3] = -5
+    ref_file = str(tmp_path / "ref.nii.gz")
+    nb.Nifti1Image(np.zeros((20, 20, 20), dtype=np.uint8), ref_affine).to_filename(ref_file)
+
+    # ITK displacements field of +1 mm along x (RAS+), stored in LPS+
+    field = np.zeros((10, 10, 10, 1, 3), dtype=np.float32)
+    field[..., 0] = -1
+    field_img = nb.Nifti1Image(field, np.eye(4))
+    field_img.header.set_intent("vector")
+    field_file = str(tmp_path / "field.nii.gz")
+    field_img.to_filename(field_file)
+
+    node = pe.Node(
+        ResampleImages(in_files=[in_file], orders=[1], ref_file=ref_file, transforms=[field_file]),
+        name="field_fov",
+        base_dir=tmp_path,
+    )
+    ret = node.run()
+
+    out_data = nb.load(ret.outputs.out_files[0]).get_fdata()
+    expected = np.zeros((20, 20, 20))
+    expected[5:14, 5:15, 5:15] = data[1:]
+    assert np.allclose(out_data, expected)
+
+
+def test_load_ants_h5(tmp_path):
+    shape = (4, 5, 6)
+    # Displacements in LPS+, distinct along every axis and component
+    disp_lps = np.stack(np.meshgrid(*(np.arange(n) for n in shape), indexing="ij"), axis=-1)
+    disp_lps = disp_lps * np.array([1.0, 10.0, 100.0])
+
+    h5_file = tmp_path / "composite.h5"
+    with h5py.File(h5_file, "w") as h5:
+        group = h5.create_group("TransformGroup")
+        group.create_group("0")["TransformType"] = [b"CompositeTransform_double_3_3"]
+        affine = group.create_group("1")
+        affine["TransformType"] = [b"AffineTransform_double_3_3"]
+        affine["TransformParameters"] = [1.0, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0]
+        affine["TransformFixedParameters"] = [0.0, 0, 0]
+        field = group.create_group("2")
+        field["TransformType"] = [b"DisplacementFieldTransform_float_3_3"]
+        field["TransformParameters"] = disp_lps.transpose(3, 0, 1, 2).reshape(-1, order="F")
+        field["TransformFixedParameters"] = [*shape, 0, 0, 0, 2, 2, 2, *np.eye(3).ravel()]
+
+    xfm = load_ants_h5(h5_file)
+
+    # Voxel (1, 2, 3) of the field sits at LPS (2, 4, 6), i.e., RAS (-2, -4, 6)
+    point = np.array([[-2.0, -4.0, 6.0]])
+    expected = point + disp_lps[1, 2, 3] * np.array([-1, -1, 1])
+    assert np.allclose(xfm.map(point), expected)
+    # Reloading reuses the parsed (read-only) field, but returns new transforms
+    reloaded = load_ants_h5(str(h5_file))
+    assert reloaded is not xfm
+    assert np.allclose(reloaded.map(point), expected)
+    assert not reloaded.transforms[0]._deltas.flags.writeable
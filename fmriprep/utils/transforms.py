@@ -0,0 +1,154 @@
+# emacs: -*- mode: python; py-indent-offset: 4; indent-tabs-mode: nil -*-
+# vi: set ft=python sts=4 ts=4 sw=4 et:
+#
+# Copyright 2023 The NiPreps Developers <nipreps@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We support and encourage derived works from this project, please read
+# about our expectations at
+#
+#     https://www.nipreps.org/community/licensing/
+#
+"""Utilities for loading transforms for resampling."""
+from functools import lru_cache
+from pathlib import Path
+
+import h5py
+import nibabel as nb
+import nitransforms as nt
+import numpy as np
+from nitransforms.io.itk import ITKCompositeH5, ITKDisplacementsField
+from scipy import ndimage as ndi
+
+# ITK works in LPS+ physical coordinates, nitransforms in RAS+
+LPS = np.diag([-1.0, -1.0, 1.0, 1.0])
+
+
+def load_transforms(xfm_paths: list) -> list:
+    """Load a series of transforms, listed in ANTs order.
+
+    As with ``antsApplyTransforms``, points of the reference grid are mapped
+    through the first transform first.
+    ``"identity"`` entries are skipped, and ANTs composite (``.h5``) files
+    are expanded into their components.
+    """
+    transforms = []
+    for path in xfm_paths:
+        if path == "identity":
+            continue
+        path = Path(path)
+        if path.suffix == ".h5":
+            xfm = load_ants_h5(path)
+        elif path.name.endswith((".nii", ".nii.gz")):
+            xfm = DisplacementsFieldTransform(ITKDisplacementsField.from_filename(path))
+        else:
+            xfm = nt.linear.load(path, fmt="itk")
+
+        if isinstance(xfm, nt.TransformChain):
+            transforms.extend(xfm.transforms)
+        else:
+            transforms.append(xfm)
+    return transforms
+
+
+def load_ants_h5(filename: Path) -> nt.base.TransformBase:
+    """Load an ANTs composite (``.h5``) transform, as written by ``antsRegistration``.
+
+    The displacement field is read directly, because ITK stores its vectors
+    in Fortran order (the vector component changing fastest), which
+    :class:`~nitransforms.io.itk.ITKCompositeH5` does not account for.
+
+    The arrays of the most recently read composite are kept (read-only), so
+    loading it again within a process does not parse the file a second time.
+    Every call returns new transform objects.
+    """
+    path = Path(filename).absolute()
+    # The modification time invalidates the entry for files rewritten in place
+    matrix, warp, warp_affine = _read_ants_h5(path, path.stat().st_mtime_ns)
+
+    affine = nt.Affine(matrix)
+    if warp is None:
+        return affine
+
+    field = DisplacementsFieldTransform(nb.Nifti1Image(warp, warp_affine))
+    # Points of the reference (fixed) space go through the displacements first
+    return nt.TransformChain([field, affine])
+
+
+@lru_cache(maxsize=1)
+def _read_ants_h5(filename: Path, mtime: int) -> tuple:
+    """Read the RAS+ affine and displacement field (with its affine) of a composite."""
+    with h5py.File(filename) as h5file:
+        xform = ITKCompositeH5.from_h5obj(h5file, only_linear=True)
+        matrix = xform[0].to_ras()
+        matrix.setflags(write=False)
+
+        if "2" not in h5file["TransformGroup"]:
+            return matrix, None, None
+
+        group = h5file["TransformGroup"]["2"]
+        if not group["TransformType"][0].startswith(b"DisplacementFieldTransform"):
+            raise ValueError(
+                f"Unsupported transform type in {filename}: {group['TransformType'][0]}"
+            )
+        fixed_params = group["TransformFixedParameters"][:]
+        warp = group["TransformParameters"][:]
+
+    shape = tuple(fixed_params[:3].astype(int))
+    warp = warp.reshape((3, *shape), order="F").transpose(1, 2, 3, 0)
+    # LPS -> RAS displacements
+    warp = (warp * np.array([-1.0, -1.0, 1.0])).astype("float32")
+    warp.setflags(write=False)
+
+    warp_affine = np.eye(4)
+    warp_affine[:3, :3] = fixed_params[9:].reshape((3, 3)) * fixed_params[6:9]
+    warp_affine[:3, 3] = fixed_params[3:6]
+    warp_affine = LPS @ warp_affine
+    warp_affine.setflags(write=False)
+    return matrix, warp, warp_affine
+
+
+class DisplacementsFieldTransform(nt.base.TransformBase):
+    """A dense field of displacements, applied as ``antsApplyTransforms`` does.
+
+    Displacements (RAS+, in mm) are interpolated linearly at each point and
+    added to it.
+    Points outside the domain of the field are left where they are, instead
+    of being sent to the origin by an interpolated field of absolute positions
+    (as :class:`~nitransforms.nonlinear.DenseFieldTransform` does).
+    """
+
+    __slots__ = ("_deltas",)
+
+    def __init__(self, field):
+        """Create the transform from a 4D image of RAS+ displacements."""
+        super().__init__()
+        self._deltas = np.asanyarray(field.dataobj, dtype="float32")
+        if self._deltas.ndim != 4 or self._deltas.shape[-1] != 3:
+            raise ValueError(f"Expected a 4D field of 3D displacements, got {self._deltas.shape}")
+        self.reference = nb.Nifti1Image(np.zeros(self._deltas.shape[:3], "uint8"), field.affine)
+
+    def map(self, x, inverse=False):
+        """Map RAS+ points (N x 3) through the field."""
+        if inverse:
+            raise NotImplementedError
+        x = np.asanyarray(x, dtype=float)
+        ijk = self.reference.index(x).T
+        deltas = np.column_stack(
+            [
+                ndi.map_coordinates(self._deltas[..., i], ijk, order=1, mode="constant", cval=0.0)
+                for i in range(3)
+            ]
+        )
+        return x + deltas
@@ -321,7 +321,9 @@ transform matrices, susceptibility distortion correction when available,
 and co-registrations to anatomical and output spaces).
 Gridded (volumetric) resamplings were performed using `antsApplyTransforms` (ANTs),
 configured with Lanczos interpolation to minimize the smoothing
-effects of other kernels [@lanczos].
+effects of other kernels [@lanczos], except for resamplings of the
+BOLD series in native and standard spaces, which were performed with
+cubic B-spline interpolation using NiTransforms and SciPy.
 Non-gridded (surface) resamplings were performed using `mri_vol2surf`
 (FreeSurfer).
 """
@@ -744,7 +746,7 @@ Non-gridded (surface) resamplings were performed using `mri_vol2surf`
         )
 
         boldmask_to_t1w = pe.Node(
-            ApplyTransforms(interpolation="MultiLabel"),
+            ApplyTransforms(interpolation="MultiLabel", args="-u uchar"),
             name="boldmask_to_t1w",
             mem_gb=0.1,
         )
@@ -783,7 +785,7 @@ Non-gridded (surface) resamplings were performed using `mri_vol2surf`
             spaces=spaces,
             multiecho=multiecho,
             name="bold_std_trans_wf",
-            use_compression=not config.execution.low_mem,
+            use_compression=config.execution.compress_work and not config.execution.low_mem,
         )
         bold_std_trans_wf.inputs.inputnode.fieldwarp = "identity"
 
@@ -1012,7 +1014,7 @@ Non-gridded (surface) resamplings were performed using `mri_vol2surf`
         bold_bold_trans_wf = init_bold_preproc_trans_wf(
             mem_gb=mem_gb["resampled"],
             omp_nthreads=omp_nthreads,
-            use_compression=not config.execution.low_mem,
+            use_compression=config.execution.compress_work and not config.execution.low_mem,
             use_fieldwarp=False,
             name="bold_bold_trans_wf",
         )
@@ -308,9 +308,8 @@ def init_bold_t1_trans_wf(
     from niworkflows.interfaces.fixes import FixHeaderApplyTransforms as ApplyTransforms
     from niworkflows.interfaces.itk import MultiApplyTransforms
     from niworkflows.interfaces.nibabel import GenerateSamplingReference
-    from niworkflows.interfaces.nilearn import Merge
 
-    from fmriprep.interfaces.maths import Clip
+    from fmriprep.interfaces.maths import ClipAndMerge
 
     workflow = Workflow(name=name)
     inputnode = pe.Node(
@@ -343,8 +342,11 @@ def init_bold_t1_trans_wf(
         GenerateSamplingReference(), name='gen_ref', mem_gb=0.3
     )  # 256x256x256 * 64 / 8 ~ 150MB
 
+    # Write labels with a narrow integer type (-u), instead of ANTs' default float
     mask_t1w_tfm = pe.Node(
-        ApplyTransforms(interpolation='MultiLabel'), name='mask_t1w_tfm', mem_gb=0.1
+        ApplyTransforms(interpolation='MultiLabel', args='-u uchar'),
+        name='mask_t1w_tfm',
+        mem_gb=0.1,
     )
     # fmt:off
     workflow.connect([
@@ -360,12 +362,12 @@ def init_bold_t1_trans_wf(
     if freesurfer:
         # Resample aseg and aparc in T1w space (no transforms needed)
         aseg_t1w_tfm = pe.Node(
-            ApplyTransforms(interpolation='MultiLabel', transforms='identity'),
+            ApplyTransforms(interpolation='MultiLabel', transforms='identity', args='-u short'),
             name='aseg_t1w_tfm',
             mem_gb=0.1,
         )
         aparc_t1w_tfm = pe.Node(
-            ApplyTransforms(interpolation='MultiLabel', transforms='identity'),
+            ApplyTransforms(interpolation='MultiLabel', transforms='identity', args='-u short'),
             name='aparc_t1w_tfm',
             mem_gb=0.1,
         )
@@ -380,20 +382,22 @@ def init_bold_t1_trans_wf(
         ])
         # fmt:on
 
+    # Fan volumes out over omp_nthreads single-threaded antsApplyTransforms processes
     bold_to_t1w_transform = pe.Node(
-        MultiApplyTransforms(interpolation="LanczosWindowedSinc", float=True, copy_dtype=True),
+        MultiApplyTransforms(
+            interpolation="LanczosWindowedSinc",
+            float=True,
+            copy_dtype=True,
+            num_threads=omp_nthreads,
+        ),
         name='bold_to_t1w_transform',
         mem_gb=mem_gb * 3 * omp_nthreads,
         n_procs=omp_nthreads,
     )
 
-    # Interpolation can occasionally produce below-zero values as an artifact
-    threshold = pe.MapNode(
-        Clip(minimum=0), name="threshold", iterfield=['in_file'], mem_gb=DEFAULT_MEMORY_MIN_GB
-    )
-
-    # merge 3D volumes into 4D timeseries
-    merge = pe.Node(Merge(compress=use_compression), name='merge', mem_gb=mem_gb)
+    # merge 3D volumes into 4D timeseries, clipping the below-zero values
+    # that interpolation can occasionally produce as an artifact
+    merge = pe.Node(ClipAndMerge(minimum=0, compress=use_compression), name='merge', mem_gb=mem_gb)
 
     # Generate a reference on the target T1w space
     gen_final_ref = init_bold_reference_wf(omp_nthreads, pre_mask=True)
@@ -415,8 +419,7 @@ def init_bold_t1_trans_wf(
         (inputnode, bold_to_t1w_transform, [('bold_split', 'input_image')]),
         (merge_xforms, bold_to_t1w_transform, [('out', 'transforms')]),
         (gen_ref, bold_to_t1w_transform, [('out_file', 'reference_image')]),
-        (bold_to_t1w_transform, threshold, [('out_files', 'in_file')]),
-        (threshold, merge, [('out_file', 'in_files')]),
+        (bold_to_t1w_transform, merge, [('out_files', 'in_files')]),
         (merge, gen_final_ref, [('out_file', 'inputnode.bold_file')]),
         (mask_t1w_tfm, gen_final_ref, [('output_image', 'inputnode.bold_mask')]),
         (merge, outputnode, [('out_file', 'bold_t1')]),
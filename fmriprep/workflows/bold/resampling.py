@@ -34,22 +34,25 @@ Resampling workflows
 """
 from __future__ import annotations
 
+import re
 import typing as ty
+from functools import lru_cache
 
-from nipype import Function
 from nipype.interfaces import freesurfer as fs
-from nipype.interfaces import fsl
 from nipype.interfaces import utility as niu
 from nipype.pipeline import engine as pe
 from niworkflows.interfaces.fixes import FixHeaderApplyTransforms as ApplyTransforms
 from niworkflows.interfaces.freesurfer import MedialNaNs
 
 from ...config import DEFAULT_MEMORY_MIN_GB
-from ...interfaces.workbench import MetricDilate, MetricMask, MetricResample
+from ...interfaces.workbench import MetricMask, MetricResample
 
 if ty.TYPE_CHECKING:
     from niworkflows.utils.spaces import SpatialReferences
 
+# Matches the surface type in GIFTI file names, skipping 'midthickness' as 'thickness'
+_SURFACE_NAME = re.compile(r'(?:^|[^d])(?P<name>white|pial|midthickness|thickness)')
+
 
 def init_bold_surf_wf(
     *,
@@ -267,6 +270,8 @@ def init_goodvoxels_bold_mask_wf(mem_gb: float, name: str = "goodvoxels_bold_mas
     goodvoxels_ribbon
         Cortical ribbon mask excluding voxels with locally high COV
     """
+    from fmriprep.interfaces.maths import GoodVoxelsMask, TemporalCoV
+
     workflow = pe.Workflow(name=name)
 
     inputnode = pe.Node(
@@ -290,212 +295,39 @@ def init_goodvoxels_bold_mask_wf(mem_gb: float, name: str = "goodvoxels_bold_mas
     ribbon_boldsrc_xfm = pe.Node(
         ApplyTransforms(interpolation='MultiLabel', transforms='identity'),
         name="ribbon_boldsrc_xfm",
-        mem_gb=mem_gb,
-    )
-
-    stdev_volume = pe.Node(
-        fsl.maths.StdImage(dimension='T'),
-        name="stdev_volume",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    mean_volume = pe.Node(
-        fsl.maths.MeanImage(dimension='T'),
-        name="mean_volume",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_volume = pe.Node(
-        fsl.maths.BinaryMaths(operation='div'),
-        name="cov_volume",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_ribbon = pe.Node(
-        fsl.ApplyMask(),
-        name="cov_ribbon",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_ribbon_mean = pe.Node(
-        fsl.ImageStats(op_string='-M'),
-        name="cov_ribbon_mean",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_ribbon_std = pe.Node(
-        fsl.ImageStats(op_string='-S'),
-        name="cov_ribbon_std",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
+        mem_gb=0.1,
     )
 
-    cov_ribbon_norm = pe.Node(
-        fsl.maths.BinaryMaths(operation='div'),
-        name="cov_ribbon_norm",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    smooth_norm = pe.Node(
-        fsl.maths.MathsCommand(args="-bin -s 5"),
-        name="smooth_norm",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    merge_smooth_norm = pe.Node(
-        niu.Merge(1),
-        name="merge_smooth_norm",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-        run_without_submitting=True,
-    )
-
-    cov_ribbon_norm_smooth = pe.Node(
-        fsl.maths.MultiImageMaths(op_string='-s 5 -div %s -dilD'),
-        name="cov_ribbon_norm_smooth",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_norm = pe.Node(
-        fsl.maths.BinaryMaths(operation='div'),
-        name="cov_norm",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_norm_modulate = pe.Node(
-        fsl.maths.BinaryMaths(operation='div'),
-        name="cov_norm_modulate",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    cov_norm_modulate_ribbon = pe.Node(
-        fsl.ApplyMask(),
-        name="cov_norm_modulate_ribbon",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    def _calc_upper_thr(in_stats):
-        return in_stats[0] + (in_stats[1] * 0.5)
-
-    upper_thr_val = pe.Node(
-        Function(
-            input_names=["in_stats"], output_names=["upper_thresh"], function=_calc_upper_thr
-        ),
-        name="upper_thr_val",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    def _calc_lower_thr(in_stats):
-        return in_stats[1] - (in_stats[0] * 0.5)
-
-    lower_thr_val = pe.Node(
-        Function(
-            input_names=["in_stats"], output_names=["lower_thresh"], function=_calc_lower_thr
-        ),
-        name="lower_thr_val",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    mod_ribbon_mean = pe.Node(
-        fsl.ImageStats(op_string='-M'),
-        name="mod_ribbon_mean",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    mod_ribbon_std = pe.Node(
-        fsl.ImageStats(op_string='-S'),
-        name="mod_ribbon_std",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    merge_mod_ribbon_stats = pe.Node(
-        niu.Merge(2),
-        name="merge_mod_ribbon_stats",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-        run_without_submitting=True,
-    )
-
-    bin_mean_volume = pe.Node(
-        fsl.maths.UnaryMaths(operation="bin"),
-        name="bin_mean_volume",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    merge_goodvoxels_operands = pe.Node(
-        niu.Merge(2),
-        name="merge_goodvoxels_operands",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-        run_without_submitting=True,
-    )
-
-    goodvoxels_thr = pe.Node(
-        fsl.maths.Threshold(),
-        name="goodvoxels_thr",
+    temporal_cov = pe.Node(
+        TemporalCoV(),
+        name="temporal_cov",
         mem_gb=mem_gb,
     )
 
     goodvoxels_mask = pe.Node(
-        fsl.maths.MultiImageMaths(op_string='-bin -sub %s -mul -1'),
+        GoodVoxelsMask(),
         name="goodvoxels_mask",
-        mem_gb=mem_gb,
+        mem_gb=DEFAULT_MEMORY_MIN_GB,
     )
 
     # make HCP-style "goodvoxels" mask in t1w space for filtering outlier voxels
     # in bold timeseries, based on modulated normalized covariance
-    workflow.connect(
-        [
-            (inputnode, ribbon_boldsrc_xfm, [("anat_ribbon", "input_image")]),
-            (inputnode, stdev_volume, [("bold_file", "in_file")]),
-            (inputnode, mean_volume, [("bold_file", "in_file")]),
-            (mean_volume, ribbon_boldsrc_xfm, [("out_file", "reference_image")]),
-            (stdev_volume, cov_volume, [("out_file", "in_file")]),
-            (mean_volume, cov_volume, [("out_file", "operand_file")]),
-            (cov_volume, cov_ribbon, [("out_file", "in_file")]),
-            (ribbon_boldsrc_xfm, cov_ribbon, [("output_image", "mask_file")]),
-            (cov_ribbon, cov_ribbon_mean, [("out_file", "in_file")]),
-            (cov_ribbon, cov_ribbon_std, [("out_file", "in_file")]),
-            (cov_ribbon, cov_ribbon_norm, [("out_file", "in_file")]),
-            (cov_ribbon_mean, cov_ribbon_norm, [("out_stat", "operand_value")]),
-            (cov_ribbon_norm, smooth_norm, [("out_file", "in_file")]),
-            (smooth_norm, merge_smooth_norm, [("out_file", "in1")]),
-            (cov_ribbon_norm, cov_ribbon_norm_smooth, [("out_file", "in_file")]),
-            (merge_smooth_norm, cov_ribbon_norm_smooth, [("out", "operand_files")]),
-            (cov_ribbon_mean, cov_norm, [("out_stat", "operand_value")]),
-            (cov_volume, cov_norm, [("out_file", "in_file")]),
-            (cov_norm, cov_norm_modulate, [("out_file", "in_file")]),
-            (cov_ribbon_norm_smooth, cov_norm_modulate, [("out_file", "operand_file")]),
-            (cov_norm_modulate, cov_norm_modulate_ribbon, [("out_file", "in_file")]),
-            (ribbon_boldsrc_xfm, cov_norm_modulate_ribbon, [("output_image", "mask_file")]),
-            (cov_norm_modulate_ribbon, mod_ribbon_mean, [("out_file", "in_file")]),
-            (cov_norm_modulate_ribbon, mod_ribbon_std, [("out_file", "in_file")]),
-            (mod_ribbon_mean, merge_mod_ribbon_stats, [("out_stat", "in1")]),
-            (mod_ribbon_std, merge_mod_ribbon_stats, [("out_stat", "in2")]),
-            (merge_mod_ribbon_stats, upper_thr_val, [("out", "in_stats")]),
-            (merge_mod_ribbon_stats, lower_thr_val, [("out", "in_stats")]),
-            (mean_volume, bin_mean_volume, [("out_file", "in_file")]),
-            (upper_thr_val, goodvoxels_thr, [("upper_thresh", "thresh")]),
-            (cov_norm_modulate, goodvoxels_thr, [("out_file", "in_file")]),
-            (bin_mean_volume, merge_goodvoxels_operands, [("out_file", "in1")]),
-            (goodvoxels_thr, goodvoxels_mask, [("out_file", "in_file")]),
-            (merge_goodvoxels_operands, goodvoxels_mask, [("out", "operand_files")]),
-        ]
-    )
-
-    goodvoxels_ribbon_mask = pe.Node(
-        fsl.ApplyMask(),
-        name_source=['in_file'],
-        keep_extension=True,
-        name="goodvoxels_ribbon_mask",
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
-    )
-
-    # apply goodvoxels ribbon mask to bold
-    workflow.connect(
-        [
-            (goodvoxels_mask, goodvoxels_ribbon_mask, [("out_file", "in_file")]),
-            (ribbon_boldsrc_xfm, goodvoxels_ribbon_mask, [("output_image", "mask_file")]),
-            (goodvoxels_mask, outputnode, [("out_file", "goodvoxels_mask")]),
-            (goodvoxels_ribbon_mask, outputnode, [("out_file", "goodvoxels_ribbon")]),
-        ]
-    )
+    # fmt: off
+    workflow.connect([
+        (inputnode, ribbon_boldsrc_xfm, [("anat_ribbon", "input_image")]),
+        (inputnode, temporal_cov, [("bold_file", "in_file")]),
+        (temporal_cov, ribbon_boldsrc_xfm, [("cov_file", "reference_image")]),
+        (temporal_cov, goodvoxels_mask, [
+            ("mask_file", "mask_file"),
+            ("cov_file", "cov_file"),
+        ]),
+        (ribbon_boldsrc_xfm, goodvoxels_mask, [("output_image", "ribbon_file")]),
+        (goodvoxels_mask, outputnode, [
+            ("out_mask", "goodvoxels_mask"),
+            ("out_ribbon", "goodvoxels_ribbon"),
+        ]),
+    ])
+    # fmt: on
 
     return workflow
 
@@ -567,7 +399,7 @@ def init_bold_fsLR_resampling_wf(
     from smriprep import data as smriprep_data
     from smriprep.interfaces.workbench import SurfaceResample
 
-    from fmriprep.interfaces.gifti import CreateROI
+    from fmriprep.interfaces.gifti import CreateROI, NearestMetricDilate
     from fmriprep.interfaces.workbench import (
         MetricFillHoles,
         MetricRemoveIslands,
@@ -581,6 +413,9 @@ def init_bold_fsLR_resampling_wf(
     workflow.__desc__ = """\
 The BOLD time-series were resampled onto the left/right-symmetric template
 "fsLR" [@hcppipelines].
+Vertices left empty by the volume-to-surface sampling were filled with the value
+of the nearest sampled vertex within 10 mm, measured along the edges of the
+midthickness surface mesh.
 """
 
     inputnode = pe.Node(
@@ -596,6 +431,30 @@ The BOLD time-series were resampled onto the left/right-symmetric template
         name='inputnode',
     )
 
+    # Template files are known at build time; they are selected by hemisphere when
+    # connecting, so that only ``hemi`` (not install paths) names the expanded nodes
+    template_spheres = dict(
+        zip(
+            ['L', 'R'],
+            sorted(
+                str(sphere)
+                for sphere in tf.get(
+                    template='fsLR',
+                    density=fslr_density,
+                    suffix='sphere',
+                    space=None,
+                    extension='.surf.gii',
+                )
+            ),
+        )
+    )
+    atlases = smriprep_data.load_resource('atlases')
+    template_rois = {
+        hemi: str(atlases / f'{hemi}.atlasroi.32k_fs_LR.shape.gii') for hemi in ['L', 'R']
+    }
+
+    # Each hemisphere expands into an independent copy of the downstream subgraph,
+    # so both are scheduled concurrently (MapNodes would add a barrier at every step).
     itersource = pe.Node(
         niu.IdentityInterface(fields=['hemi']),
         name='itersource',
@@ -623,27 +482,11 @@ The BOLD time-series were resampled onto the left/right-symmetric template
                 'midthickness',
                 'thickness',
                 'sphere_reg',
-                'template_sphere',
-                'template_roi',
             ],
         ),
         name='select_surfaces',
+        run_without_submitting=True,
     )
-    select_surfaces.inputs.template_spheres = [
-        str(sphere)
-        for sphere in tf.get(
-            template='fsLR',
-            density=fslr_density,
-            suffix='sphere',
-            space=None,
-            extension='.surf.gii',
-        )
-    ]
-    atlases = smriprep_data.load_resource('atlases')
-    select_surfaces.inputs.template_rois = [
-        str(atlases / 'L.atlasroi.32k_fs_LR.shape.gii'),
-        str(atlases / 'R.atlasroi.32k_fs_LR.shape.gii'),
-    ]
 
     # Reimplements lines 282-290 of FreeSurfer2CaretConvertAndRegisterNonlinear.sh
     initial_roi = pe.Node(CreateROI(), name="initial_roi", mem_gb=DEFAULT_MEMORY_MIN_GB)
@@ -668,9 +511,9 @@ The BOLD time-series were resampled onto the left/right-symmetric template
         n_procs=omp_nthreads,
     )
     metric_dilate = pe.Node(
-        MetricDilate(distance=10, nearest=True),
+        NearestMetricDilate(distance=10),
         name="metric_dilate",
-        n_procs=omp_nthreads,
+        mem_gb=mem_gb,
     )
     mask_native = pe.Node(MetricMask(), name="mask_native")
     resample_to_fsLR = pe.Node(
@@ -700,7 +543,9 @@ The BOLD time-series were resampled onto the left/right-symmetric template
         (select_surfaces, downsampled_midthickness, [
             ('midthickness', 'surface_in'),
             ('sphere_reg', 'current_sphere'),
-            ('template_sphere', 'new_sphere'),
+        ]),
+        (itersource, downsampled_midthickness, [
+            (('hemi', _select_hemi, template_spheres), 'new_sphere'),
         ]),
         # Resample BOLD to native surface, dilate and mask
         (inputnode, volume_to_surface, [
@@ -718,13 +563,15 @@ The BOLD time-series were resampled onto the left/right-symmetric template
         # Resample BOLD to fsLR and mask
         (select_surfaces, resample_to_fsLR, [
             ('sphere_reg', 'current_sphere'),
-            ('template_sphere', 'new_sphere'),
             ('midthickness', 'current_area'),
         ]),
+        (itersource, resample_to_fsLR, [
+            (('hemi', _select_hemi, template_spheres), 'new_sphere'),
+        ]),
         (downsampled_midthickness, resample_to_fsLR, [('surface_out', 'new_area')]),
         (native_roi, resample_to_fsLR, [('out_file', 'roi_metric')]),
         (mask_native, resample_to_fsLR, [('out_file', 'in_file')]),
-        (select_surfaces, mask_fsLR, [('template_roi', 'mask')]),
+        (itersource, mask_fsLR, [(('hemi', _select_hemi, template_rois), 'mask')]),
         (resample_to_fsLR, mask_fsLR, [('out_file', 'in_file')]),
         # Output
         (mask_fsLR, joinnode, [('out_file', 'bold_fsLR')]),
@@ -872,13 +719,11 @@ def init_bold_std_trans_wf(
     from niworkflows.engine.workflows import LiterateWorkflow as Workflow
     from niworkflows.func.util import init_bold_reference_wf
     from niworkflows.interfaces.fixes import FixHeaderApplyTransforms as ApplyTransforms
-    from niworkflows.interfaces.itk import MultiApplyTransforms
     from niworkflows.interfaces.nibabel import GenerateSamplingReference
-    from niworkflows.interfaces.nilearn import Merge
     from niworkflows.interfaces.utility import KeySelect
     from niworkflows.utils.spaces import format_reference
 
-    from fmriprep.interfaces.maths import Clip
+    from fmriprep.interfaces.resampling import ResampleImages, ResampleSeries
 
     workflow = Workflow(name=name)
     output_references = spaces.cached.get_spaces(nonstandard=False, dim=(3,))
@@ -921,18 +766,37 @@ preprocessed BOLD runs*: {tpl}.
         name="inputnode",
     )
 
+    output_names = [
+        "bold_mask_std",
+        "bold_std",
+        "bold_std_ref",
+        "spatial_reference",
+        "template",
+    ]
+    if freesurfer:
+        output_names.extend(["bold_aseg_std", "bold_aparc_std"])
+    if multiecho:
+        output_names.append("t2star_std")
+
+    if not std_vol_references:
+        # Nothing to resample, skip building the rest of the graph
+        workflow.add_nodes(
+            [inputnode, pe.Node(niu.IdentityInterface(fields=output_names), name="outputnode")]
+        )
+        return workflow
+
     iterablesource = pe.Node(niu.IdentityInterface(fields=["std_target"]), name="iterablesource")
     # Generate conversions for every template+spec at the input
     iterablesource.iterables = [("std_target", std_vol_references)]
 
-    split_target = pe.Node(
+    resolve_target = pe.Node(
         niu.Function(
-            function=_split_spec,
+            function=_resolve_target,
             input_names=["in_target"],
-            output_names=["space", "template", "spec"],
+            output_names=["space", "template", "spec", "tpl_path"],
         ),
         run_without_submitting=True,
-        name="split_target",
+        name="resolve_target",
     )
 
     select_std = pe.Node(
@@ -941,26 +805,15 @@ preprocessed BOLD runs*: {tpl}.
         run_without_submitting=True,
     )
 
-    select_tpl = pe.Node(
-        niu.Function(function=_select_template),
-        name="select_tpl",
-        run_without_submitting=True,
-    )
-
     gen_ref = pe.Node(
         GenerateSamplingReference(), name="gen_ref", mem_gb=0.3
     )  # 256x256x256 * 64 / 8 ~ 150MB)
 
+    # Write labels with a narrow integer type (-u), instead of ANTs' default float
     mask_std_tfm = pe.Node(
-        ApplyTransforms(interpolation="MultiLabel"), name="mask_std_tfm", mem_gb=1
-    )
-
-    # Write corrected file in the designated output dir
-    mask_merge_tfms = pe.Node(
-        niu.Merge(2),
-        name="mask_merge_tfms",
-        run_without_submitting=True,
-        mem_gb=DEFAULT_MEMORY_MIN_GB,
+        ApplyTransforms(interpolation="MultiLabel", args="-u uchar"),
+        name="mask_std_tfm",
+        mem_gb=1,
     )
 
     merge_xforms = pe.Node(
@@ -970,26 +823,19 @@ preprocessed BOLD runs*: {tpl}.
         mem_gb=DEFAULT_MEMORY_MIN_GB,
     )
 
+    # Resample, clip and merge the whole series in one process
     bold_to_std_transform = pe.Node(
-        MultiApplyTransforms(interpolation="LanczosWindowedSinc", float=True, copy_dtype=True),
+        ResampleSeries(compress=use_compression, num_threads=omp_nthreads),
         name="bold_to_std_transform",
-        mem_gb=mem_gb * 3 * omp_nthreads,
+        mem_gb=_resample_series_mem_gb(mem_gb, omp_nthreads),
         n_procs=omp_nthreads,
     )
 
-    # Interpolation can occasionally produce below-zero values as an artifact
-    threshold = pe.MapNode(
-        Clip(minimum=0), name="threshold", iterfield=['in_file'], mem_gb=DEFAULT_MEMORY_MIN_GB
-    )
-
-    merge = pe.Node(Merge(compress=use_compression), name="merge", mem_gb=mem_gb * 3)
-
     # Generate a reference on the target standard space
     gen_final_ref = init_bold_reference_wf(omp_nthreads=omp_nthreads, pre_mask=True)
     # fmt:off
     workflow.connect([
-        (iterablesource, split_target, [("std_target", "in_target")]),
-        (iterablesource, select_tpl, [("std_target", "template")]),
+        (iterablesource, resolve_target, [("std_target", "in_target")]),
         (inputnode, select_std, [("anat2std_xfm", "anat2std_xfm"),
                                  ("templates", "keys")]),
         (inputnode, mask_std_tfm, [("bold_mask", "input_image")]),
@@ -997,83 +843,74 @@ preprocessed BOLD runs*: {tpl}.
         (inputnode, merge_xforms, [("hmc_xforms", "in4"),
                                    ("fieldwarp", "in3"),
                                    (("itk_bold_to_t1", _aslist), "in2")]),
-        (inputnode, merge, [("name_source", "header_source")]),
-        (inputnode, mask_merge_tfms, [(("itk_bold_to_t1", _aslist), "in2")]),
-        (inputnode, bold_to_std_transform, [("bold_split", "input_image")]),
-        (split_target, select_std, [("space", "key")]),
+        (inputnode, bold_to_std_transform, [("bold_split", "in_file"),
+                                            ("name_source", "header_source")]),
+        (resolve_target, select_std, [("space", "key")]),
         (select_std, merge_xforms, [("anat2std_xfm", "in1")]),
-        (select_std, mask_merge_tfms, [("anat2std_xfm", "in1")]),
-        (split_target, gen_ref, [(("spec", _is_native), "keep_native")]),
-        (select_tpl, gen_ref, [("out", "fixed_image")]),
+        (resolve_target, gen_ref, [(("spec", _is_native), "keep_native"),
+                                   ("tpl_path", "fixed_image")]),
         (merge_xforms, bold_to_std_transform, [("out", "transforms")]),
-        (gen_ref, bold_to_std_transform, [("out_file", "reference_image")]),
+        (gen_ref, bold_to_std_transform, [("out_file", "ref_file")]),
         (gen_ref, mask_std_tfm, [("out_file", "reference_image")]),
-        (mask_merge_tfms, mask_std_tfm, [("out", "transforms")]),
+        # The mask is only mapped through the first two (anat2std, BOLD-to-T1w)
+        (merge_xforms, mask_std_tfm, [(("out", _mask_xforms), "transforms")]),
         (mask_std_tfm, gen_final_ref, [("output_image", "inputnode.bold_mask")]),
-        (bold_to_std_transform, threshold, [("out_files", "in_file")]),
-        (threshold, merge, [("out_file", "in_files")]),
-        (merge, gen_final_ref, [("out_file", "inputnode.bold_file")]),
+        (bold_to_std_transform, gen_final_ref, [("out_file", "inputnode.bold_file")]),
     ])
     # fmt:on
 
-    output_names = [
-        "bold_mask_std",
-        "bold_std",
-        "bold_std_ref",
-        "spatial_reference",
-        "template",
-    ]
-    if freesurfer:
-        output_names.extend(["bold_aseg_std", "bold_aparc_std"])
-    if multiecho:
-        output_names.append("t2star_std")
-
     poutputnode = pe.Node(niu.IdentityInterface(fields=output_names), name="poutputnode")
     # fmt:off
     workflow.connect([
         # Connecting outputnode
         (iterablesource, poutputnode, [
             (("std_target", format_reference), "spatial_reference")]),
-        (merge, poutputnode, [("out_file", "bold_std")]),
+        (bold_to_std_transform, poutputnode, [("out_file", "bold_std")]),
         (gen_final_ref, poutputnode, [("outputnode.ref_image", "bold_std_ref")]),
         (mask_std_tfm, poutputnode, [("output_image", "bold_mask_std")]),
         (select_std, poutputnode, [("key", "template")]),
     ])
     # fmt:on
 
+    # Images already aligned with the anatomical reference, as (input, interpolation, output)
+    anat_images = []
     if freesurfer:
-        # Sample the parcellation files to functional space
-        aseg_std_tfm = pe.Node(
-            ApplyTransforms(interpolation="MultiLabel"), name="aseg_std_tfm", mem_gb=1
-        )
-        aparc_std_tfm = pe.Node(
-            ApplyTransforms(interpolation="MultiLabel"), name="aparc_std_tfm", mem_gb=1
-        )
-        # fmt:off
-        workflow.connect([
-            (inputnode, aseg_std_tfm, [("bold_aseg", "input_image")]),
-            (inputnode, aparc_std_tfm, [("bold_aparc", "input_image")]),
-            (select_std, aseg_std_tfm, [("anat2std_xfm", "transforms")]),
-            (select_std, aparc_std_tfm, [("anat2std_xfm", "transforms")]),
-            (gen_ref, aseg_std_tfm, [("out_file", "reference_image")]),
-            (gen_ref, aparc_std_tfm, [("out_file", "reference_image")]),
-            (aseg_std_tfm, poutputnode, [("output_image", "bold_aseg_std")]),
-            (aparc_std_tfm, poutputnode, [("output_image", "bold_aparc_std")]),
-        ])
-        # fmt:on
-
+        anat_images += [
+            ("bold_aseg", "label", "bold_aseg_std"),
+            ("bold_aparc", "label", "bold_aparc_std"),
+        ]
     if multiecho:
-        t2star_std_tfm = pe.Node(
-            ApplyTransforms(interpolation="LanczosWindowedSinc", float=True),
-            name="t2star_std_tfm",
+        anat_images.append(("t2star", 3, "t2star_std"))
+
+    if anat_images:
+        # Map the reference grid through anat2std once and sample all images with it
+        merge_anat = pe.Node(
+            niu.Merge(len(anat_images)),
+            name="merge_anat",
+            run_without_submitting=True,
+            mem_gb=DEFAULT_MEMORY_MIN_GB,
+        )
+        anat_std_tfm = pe.Node(
+            ResampleImages(orders=[interp for _, interp, _ in anat_images]),
+            name="anat_std_tfm",
             mem_gb=1,
         )
+        split_anat = pe.Node(
+            niu.Split(splits=[1] * len(anat_images), squeeze=True),
+            name="split_anat",
+            run_without_submitting=True,
+            mem_gb=DEFAULT_MEMORY_MIN_GB,
+        )
         # fmt:off
         workflow.connect([
-            (inputnode, t2star_std_tfm, [("t2star", "input_image")]),
-            (select_std, t2star_std_tfm, [("anat2std_xfm", "transforms")]),
-            (gen_ref, t2star_std_tfm, [("out_file", "reference_image")]),
-            (t2star_std_tfm, poutputnode, [("output_image", "t2star_std")]),
+            (inputnode, merge_anat, [
+                (field, f"in{idx}") for idx, (field, _, _) in enumerate(anat_images, 1)]),
+            (merge_anat, anat_std_tfm, [("out", "in_files")]),
+            (select_std, anat_std_tfm, [(("anat2std_xfm", _aslist), "transforms")]),
+            (gen_ref, anat_std_tfm, [("out_file", "ref_file")]),
+            (anat_std_tfm, split_anat, [("out_files", "inlist")]),
+            (split_anat, poutputnode, [
+                (f"out{idx}", field) for idx, (_, _, field) in enumerate(anat_images, 1)]),
         ])
         # fmt:on
 
@@ -1097,7 +934,6 @@ def init_bold_preproc_trans_wf(
     name: str = "bold_preproc_trans_wf",
     use_compression: bool = True,
     use_fieldwarp: bool = False,
-    interpolation: str = "LanczosWindowedSinc",
 ):
     """
     Resample in native (original) space.
@@ -1125,9 +961,6 @@ def init_bold_preproc_trans_wf(
         Save registered BOLD series as ``.nii.gz``
     use_fieldwarp : :obj:`bool`
         Include SDC warp in single-shot transform from BOLD to MNI
-    interpolation : :obj:`str`
-        Interpolation type to be used by ANTs' ``applyTransforms``
-        (default ``"LanczosWindowedSinc"``)
 
     Inputs
     ------
@@ -1148,10 +981,8 @@ def init_bold_preproc_trans_wf(
 
     """
     from niworkflows.engine.workflows import LiterateWorkflow as Workflow
-    from niworkflows.interfaces.itk import MultiApplyTransforms
-    from niworkflows.interfaces.nilearn import Merge
 
-    from fmriprep.interfaces.maths import Clip
+    from fmriprep.interfaces.resampling import ResampleSeries
 
     workflow = Workflow(name=name)
     workflow.__desc__ = """\
@@ -1186,31 +1017,23 @@ the transforms to correct for head-motion"""
         mem_gb=DEFAULT_MEMORY_MIN_GB,
     )
 
+    # Resample, clip and merge the whole series in one process
     bold_transform = pe.Node(
-        MultiApplyTransforms(interpolation=interpolation, copy_dtype=True),
+        ResampleSeries(compress=use_compression, num_threads=omp_nthreads),
         name="bold_transform",
-        mem_gb=mem_gb * 3 * omp_nthreads,
+        mem_gb=_resample_series_mem_gb(mem_gb, omp_nthreads),
         n_procs=omp_nthreads,
     )
 
-    # Interpolation can occasionally produce below-zero values as an artifact
-    threshold = pe.MapNode(
-        Clip(minimum=0), name="threshold", iterfield=['in_file'], mem_gb=DEFAULT_MEMORY_MIN_GB
-    )
-
-    merge = pe.Node(Merge(compress=use_compression), name="merge", mem_gb=mem_gb * 3)
-
     # fmt:off
     workflow.connect([
         (inputnode, merge_xforms, [("fieldwarp", "in1"),
                                    ("hmc_xforms", "in2")]),
-        (inputnode, bold_transform, [("bold_file", "input_image"),
-                                     (("bold_file", _first), "reference_image")]),
-        (inputnode, merge, [("name_source", "header_source")]),
+        (inputnode, bold_transform, [("bold_file", "in_file"),
+                                     (("bold_file", _first), "ref_file"),
+                                     ("name_source", "header_source")]),
         (merge_xforms, bold_transform, [("out", "transforms")]),
-        (bold_transform, threshold, [("out_files", "in_file")]),
-        (threshold, merge, [("out_file", "in_files")]),
-        (merge, outputnode, [("out_file", "bold")]),
+        (bold_transform, outputnode, [("out_file", "bold")]),
     ])
     # fmt:on
     return workflow
@@ -1326,18 +1149,20 @@ data transformed to {mni_density} mm resolution MNI152NLin6Asym space.
     return workflow
 
 
-def _split_spec(in_target):
+def _resolve_target(in_target):
+    from fmriprep.workflows.bold.resampling import _resolve_template_specs
+
     space, spec = in_target
-    template = space.split(":")[0]
-    return space, template, spec
+    template = space.split(":")[0]  # Drop any cohort modifier if present
+    return space, template, spec, _resolve_template_specs(template, tuple(sorted(spec.items())))
 
 
-def _select_template(template):
+@lru_cache(maxsize=None)
+def _resolve_template_specs(template, specs_items):
+    """Find the template file for some specs, querying TemplateFlow once per combination."""
     from niworkflows.utils.misc import get_template_specs
 
-    template, specs = template
-    template = template.split(":")[0]  # Drop any cohort modifier if present
-    specs = specs.copy()
+    specs = dict(specs_items)
     specs["suffix"] = specs.get("suffix", "T1w")
 
     # Sanitize resolution
@@ -1367,6 +1192,37 @@ def _aslist(in_value):
     return [in_value]
 
 
+def _resample_series_mem_gb(mem_gb, num_threads):
+    """Estimate the memory (GB) taken by a :class:`~fmriprep.interfaces.resampling.ResampleSeries`.
+
+    ``mem_gb`` is the size of the resampled series in double precision, estimated
+    for a target grid four times larger than the input.
+    The node holds:
+
+    * the input series in single precision (an eighth of ``mem_gb``);
+    * the output series in single precision (budgeted at a full ``mem_gb``,
+      which covers targets of up to eight times the input voxels, e.g.,
+      1 mm templates from 2 mm data);
+    * the mapped target-grid coordinates and the buffers used while mapping
+      them through the transforms (another ``mem_gb``, generous for any run
+      longer than a few volumes);
+    * per thread, a prefiltered input volume and a chunk of coordinates (0.1 GB).
+
+    >>> _resample_series_mem_gb(2.0, 4)
+    4.65
+
+    """
+    return round(mem_gb * 2.125 + 0.1 * num_threads, 3)
+
+
+def _select_hemi(hemi, files):
+    return files[hemi]
+
+
+def _mask_xforms(xforms):
+    return xforms[:2]
+
+
 def _is_native(in_value):
     return in_value.get("resolution") == "native" or in_value.get("res") == "native"
 
@@ -1388,27 +1244,24 @@ def _select_surfaces(
     surfaces,
     morphometrics,
     spherical_registrations,
-    template_spheres,
-    template_rois,
 ):
     # This function relies on the basenames of the files to differ by L/R or l/r
     # so that the sorting correctly identifies left or right.
+    # Each list holds one file per hemisphere, so the left one sorts first.
     import os
-    import re
 
-    idx = 0 if hemi == "L" else 1
+    from fmriprep.workflows.bold.resampling import _SURFACE_NAME
+
+    select = min if hemi == "L" else max
     container = {
         'white': [],
         'pial': [],
         'midthickness': [],
         'thickness': [],
-        'sphere': sorted(spherical_registrations),
-        'template_sphere': sorted(template_spheres),
-        'template_roi': sorted(template_rois),
+        'sphere': spherical_registrations,
     }
-    find_name = re.compile(r'(?:^|[^d])(?P<name>white|pial|midthickness|thickness)')
     for surface in surfaces + morphometrics:
-        match = find_name.search(os.path.basename(surface))
+        match = _SURFACE_NAME.search(os.path.basename(surface))
         if match:
             container[match.group('name')].append(surface)
-    return tuple(sorted(surflist, key=os.path.basename)[idx] for surflist in container.values())
+    return tuple(select(surflist, key=os.path.basename) for surflist in container.values())